@@ -1,101 +1,150 @@
+import random
 import numpy as np
-from copy import deepcopy
 from meta import GameMeta
 
 class ConnectState:
+    __slots__ = ('bb', 'current_player', 'column_heights', 'last_move', 'move_count', 'zhash', '_last_victory')
+
     def __init__(self):
         """
-        Initializes the ConnectState with an empty board, sets the current player,
-        initializes column heights, and tracks the last move made.
+        Initializes the ConnectState with an empty bitboard for each player, sets the
+        current player, initializes column heights, and tracks the last move made
+        along with the Zobrist hash of the position and the cached victory check.
         """
-        self.board = [[0 for _ in range(GameMeta.COLS)] for _ in range(GameMeta.ROWS)]
+        self.bb = [0, 0]
         self.current_player = GameMeta.PLAYERS['one']
         self.column_heights = [GameMeta.ROWS - 1 for _ in range(GameMeta.COLS)]
         self.last_move = None
+        self.move_count = 0
+        self.zhash = 0
+        self._last_victory = None
+
+    def clone(self):
+        """
+        Returns a copy of the state. The bitboards and hash are plain ints, so only
+        the two small lists need copying.
+        """
+        state = ConnectState.__new__(ConnectState)
+        state.bb = self.bb[:]
+        state.current_player = self.current_player
+        state.column_heights = self.column_heights[:]
+        state.last_move = self.last_move
+        state.move_count = self.move_count
+        state.zhash = self.zhash
+        state._last_victory = self._last_victory
+        return state
+
+    def cell(self, row, col):
+        """
+        Returns the player occupying (row, col), read directly from the bitboards.
+        """
+        shift = col * GameMeta.BB_HEIGHT + GameMeta.ROWS - 1 - row
+        if self.bb[0] >> shift & 1:
+            return GameMeta.PLAYERS['one']
+        if self.bb[1] >> shift & 1:
+            return GameMeta.PLAYERS['two']
+        return GameMeta.PLAYERS['none']
 
     def get_board(self):
         """
-        Returns a deep copy of the current board state.
+        Reconstructs the board from the bitboards as a list of rows, top row first.
         """
-        return deepcopy(self.board)
+        return [[self.cell(row, col) for col in range(GameMeta.COLS)] for row in range(GameMeta.ROWS)]
 
-    def make_move(self, col):
+    # The hot methods below bind GameMeta constants as default arguments, which turns
+    # each attribute chain and dict lookup into a local variable load.
+
+    def make_move(self, col, _BB_HEIGHT=GameMeta.BB_HEIGHT, _TOP_ROW=GameMeta.ROWS - 1, _ZOBRIST=GameMeta.ZOBRIST,
+                  _ONE=GameMeta.PLAYERS['one'], _TWO=GameMeta.PLAYERS['two'], _COLS=GameMeta.COLS):
         """
-        Makes a move in the specified column, updates the board, tracks the last move,
-        adjusts column heights, and switches to the other player.
+        Makes a move in the specified column, sets the player's bit on their bitboard,
+        tracks the last move, updates the Zobrist hash, adjusts column heights, and
+        switches to the other player. Raises ValueError if the column is off the
+        board or full.
         """
+        if not (0 <= col < _COLS and self.column_heights[col] >= 0):
+            raise ValueError(f'column {col} is not a legal move')
+        player = self.current_player
         row = self.column_heights[col]
-        self.board[row][col] = self.current_player
+        self.bb[player - 1] ^= 1 << (col * _BB_HEIGHT + _TOP_ROW - row)
+        self.zhash ^= _ZOBRIST[player - 1][row][col]
         self.last_move = (row, col)
-        self.column_heights[col] -= 1
-        self.current_player = GameMeta.PLAYERS['two'] if self.current_player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        self.column_heights[col] = row - 1
+        self.move_count += 1
+        self._last_victory = None
+        self.current_player = _TWO if player == _ONE else _ONE
 
-    def available_moves(self):
+    def available_moves(self, _FREE_MOVES=GameMeta.FREE_MOVES, _TOP_MASK=GameMeta.TOP_MASK):
         """
-        Returns a list of columns that are not full and can accept a new move.
+        Returns a list of columns that are not full and can accept a new move,
+        looked up from the free top cells of both bitboards.
         """
-        return [col for col in range(GameMeta.COLS) if self.board[0][col] == 0]
+        bb = self.bb
+        return list(_FREE_MOVES[~(bb[0] | bb[1]) & _TOP_MASK])
 
-    def check_victory(self):
+    def random_legal_move(self, rand=random.random, _COLS=GameMeta.COLS):
         """
-        Checks if the last move resulted in a victory for the player who made the move.
+        Returns a uniformly random column that can accept a move, rejection sampling
+        the column heights instead of building the list of available moves. The
+        board must not be full.
         """
-        if self.last_move and self.is_winning_move(self.last_move[0], self.last_move[1]):
-            return self.board[self.last_move[0]][self.last_move[1]]
-        return 0
+        heights = self.column_heights
+        while True:
+            col = int(rand() * _COLS)
+            if heights[col] >= 0:
+                return col
 
-    def is_winning_move(self, row, col):
+    def check_victory(self, _ONE=GameMeta.PLAYERS['one'], _TWO=GameMeta.PLAYERS['two']):
         """
-        Determines if the move at (row, col) resulted in a win by checking all possible
-        directions: horizontal, vertical, and both diagonals.
-        """
-        player = self.board[row][col]
-
-        # Horizontal check
-        consecutive_count = 1
-        for d in [-1, 1]:
-            r, c = row, col
-            while 0 <= c + d < GameMeta.COLS and self.board[r][c + d] == player:
-                consecutive_count += 1
-                c += d
-        if consecutive_count >= 4:
-            return True
-
-        # Vertical check
-        consecutive_count = 1
-        for d in [-1, 1]:
-            r, c = row, col
-            while 0 <= r + d < GameMeta.ROWS and self.board[r + d][c] == player:
-                consecutive_count += 1
-                r += d
-        if consecutive_count >= 4:
-            return True
+        Checks if the last move resulted in a victory for the player who made the move.
+        The result is cached until the next move.
+        """
+        victory = self._last_victory
+        if victory is None:
+            last_move = self.last_move
+            if last_move and self.is_winning_move(last_move[0], last_move[1]):
+                victory = _TWO if self.current_player == _ONE else _ONE
+            else:
+                victory = 0
+            self._last_victory = victory
+        return victory
 
-        # Diagonal checks
-        for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-            consecutive_count = 1
-            r, c = row, col
-            while 0 <= r + dr < GameMeta.ROWS and 0 <= c + dc < GameMeta.COLS and self.board[r + dr][c + dc] == player:
-                consecutive_count += 1
-                r += dr
-                c += dc
-            if consecutive_count >= 4:
+    def is_winning_move(self, row, col, _BB_HEIGHT=GameMeta.BB_HEIGHT, _TOP_ROW=GameMeta.ROWS - 1, _WIN_LINES=GameMeta.WIN_LINES):
+        """
+        Determines if the move at (row, col) completed four in a row for the player
+        who made it, testing only the precomputed win lines through that cell.
+        """
+        bb0, bb1 = self.bb
+        bb = bb0 if bb0 >> (col * _BB_HEIGHT + _TOP_ROW - row) & 1 else bb1
+        for line in _WIN_LINES[row][col]:
+            if bb & line == line:
                 return True
-
         return False
 
-    def is_game_over(self):
+    def is_game_over(self, _CELLS=GameMeta.ROWS * GameMeta.COLS):
         """
         Checks if the game is over either by a win or a draw.
         """
-        return self.check_victory() or not self.available_moves()
+        return self.check_victory() or self.move_count == _CELLS
+
+    def terminal_state(self, _CELLS=GameMeta.ROWS * GameMeta.COLS, _DRAW=GameMeta.OUTCOMES['draw'], _NONE=GameMeta.OUTCOMES['none']):
+        """
+        Returns a tuple (is_over, outcome) from a single victory check, where the
+        outcome is the winner, 'draw', or 'none' while the game continues.
+        """
+        winner = self.check_victory()
+        if winner:
+            return True, winner
+        if self.move_count == _CELLS:
+            return True, _DRAW
+        return False, _NONE
 
     def get_winner(self):
         """
         Returns the outcome of the game. If the game is a draw, it returns 'draw',
         otherwise it returns the winner ('one' or 'two').
         """
-        if not self.available_moves() and self.check_victory() == 0:
+        if self.move_count == GameMeta.ROWS * GameMeta.COLS and self.check_victory() == 0:
             return GameMeta.OUTCOMES['draw']
         return GameMeta.OUTCOMES['one'] if self.check_victory() == GameMeta.PLAYERS['one'] else GameMeta.OUTCOMES['two']
 
@@ -106,7 +155,8 @@ class ConnectState:
         print('==============================')
         for row in range(GameMeta.ROWS):
             for col in range(GameMeta.COLS):
-                token = 'X' if self.board[row][col] == GameMeta.PLAYERS['one'] else 'O' if self.board[row][col] == GameMeta.PLAYERS['two'] else ' '
+                player = self.cell(row, col)
+                token = 'X' if player == GameMeta.PLAYERS['one'] else 'O' if player == GameMeta.PLAYERS['two'] else ' '
                 print(f'| {token} ', end='')
             print('|')
         print('==============================')
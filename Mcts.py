@@ -1,110 +1,343 @@
 import random
 import time
 import math
-from copy import deepcopy
-from ConnectState import ConnectState
+import multiprocessing
+import numpy as np
 from meta import GameMeta, MCTSMeta
 
+try:
+    from connect_state import ConnectState  # Compiled with setup.py build_ext --inplace
+except ImportError:
+    from ConnectState import ConnectState
+
+try:
+    from rollout_numba import playout, batch_playout
+except ImportError:
+    playout = batch_playout = None
+
+# Lookup tables for the UCT formula, indexed by visit count
+_LOG = [0.0] + [math.log(n) for n in range(1, MCTSMeta.UCT_TABLE_SIZE)]
+_INV_SQRT = [0.0] + [1.0 / math.sqrt(n) for n in range(1, MCTSMeta.UCT_TABLE_SIZE)]
+
+def fast_log(n: int) -> float:
+    """
+    Returns log(n) from the lookup table, or 0 for n == 0.
+    """
+    return _LOG[n] if n < MCTSMeta.UCT_TABLE_SIZE else math.log(n)
+
 class TreeNode:
+    __slots__ = ('action', 'parents', 'visit_count', 'win_count', 'children', 'depth', 'key')
+
     def __init__(self, action, parent_node):
         """
-        Initializes a TreeNode with an action, parent node, visit count,
-        win count, children, and game outcome.
+        Initializes a TreeNode with an action, parent nodes, visit count,
+        win count, children, depth (moves played in its position), and its
+        transposition table key. A node reached again through a transposition
+        gains further parents, so the tree becomes a DAG. Children stay None until
+        the node is expanded, then become a list indexed by column.
         """
         self.action = action
-        self.parent_node = parent_node
+        self.parents = [parent_node] if parent_node else []
         self.visit_count = 0  # Node visit count
         self.win_count = 0    # Node win count
-        self.children = {}
-        self.outcome = GameMeta.PLAYERS['none']
-        self.nodes_expanded = 0
+        self.children = None
+        self.depth = 0
+        self.key = None
 
-    def add_children(self, child_nodes: list) -> None:
+    def add_children(self, child_nodes: dict) -> None:
         """
-        Adds child nodes to the current node.
+        Adds child nodes, keyed by the action leading to them, to the current node.
         """
-        for child in child_nodes:
-            self.children[child.action] = child
+        if self.children is None:
+            self.children = [None] * GameMeta.COLS
+        for action, child in child_nodes.items():
+            self.children[action] = child
 
-    def calculate_value(self, exploration: float = MCTSMeta.EXPLORATION):
+    def child_items(self) -> list:
         """
-        Calculates the value of the node using the UCT formula.
+        Returns the (action, child) pairs of the expanded children.
         """
-        if self.visit_count == 0:
+        if self.children is None:
+            return []
+        return [(action, child) for action, child in enumerate(self.children) if child is not None]
+
+    def calculate_value_fast(self, sqrt_log_parent: float, exploration: float = MCTSMeta.EXPLORATION):
+        """
+        Calculates the value of the node using the UCT formula, taking
+        sqrt(log(parent visits)) precomputed by the caller so it is evaluated once
+        per parent. The child's inverse square root comes from the lookup table.
+        """
+        visits = self.visit_count
+        if visits == 0:
             return 0 if exploration == 0 else GameMeta.INF
         else:
-            return self.win_count / self.visit_count + exploration * math.sqrt(math.log(self.parent_node.visit_count) / self.visit_count)
+            inv_sqrt = _INV_SQRT[visits] if visits < MCTSMeta.UCT_TABLE_SIZE else 1.0 / math.sqrt(visits)
+            return self.win_count / visits + exploration * sqrt_log_parent * inv_sqrt
 
 class MonteCarloTreeSearch:
     def __init__(self, state=ConnectState()):
         """
         Initializes the MCTS with the initial game state.
         """
-        self.root_state = deepcopy(state)
+        self.root_state = state.clone()
         self.root_node = TreeNode(None, None)
+        self.root_node.depth = self.root_state.move_count
+        self.max_depth = self.root_node.depth  # Deepest node expanded so far
         self.execution_time = 0
         self.node_count = 0
         self.rollout_count = 0
+        self.tt = {}  # (zhash, current_player) -> TreeNode
+        self._pool = None  # Worker processes kept between run_search_parallel calls
+        self._pool_workers = 0
 
-    def select_promising_node(self) -> tuple:
+    def select_promising_node(self, path: list = None) -> tuple:
         """
         Selects the most promising node to explore by traversing the tree using the UCT formula.
+        If a path list is given, every node passed through is appended to it.
         """
         current_node = self.root_node
-        game_state = deepcopy(self.root_state)
+        game_state = self.root_state.clone()
+        if path is not None:
+            path.append(current_node)
         while current_node.children:
-            children_nodes = list(current_node.children.values())
-            max_value = max(child.calculate_value() for child in children_nodes)
-            best_nodes = [child for child in children_nodes if child.calculate_value() == max_value]
-            current_node = random.choice(best_nodes)
-            game_state.make_move(current_node.action)  # Use make_move
+            children_nodes = current_node.child_items()
+            sqrt_log_parent = math.sqrt(fast_log(current_node.visit_count))
+            values = [child.calculate_value_fast(sqrt_log_parent) for _, child in children_nodes]
+            max_value = max(values)
+            best_nodes = [item for item, value in zip(children_nodes, values) if value == max_value]
+            action, current_node = random.choice(best_nodes)
+            game_state.make_move(action)  # Use make_move
+            if path is not None:
+                path.append(current_node)
             if current_node.visit_count == 0:
                 return current_node, game_state
         if self.expand_node(current_node, game_state):
-            current_node = random.choice(list(current_node.children.values()))
-            game_state.make_move(current_node.action)  # Use make_move
+            action, current_node = random.choice(current_node.child_items())
+            game_state.make_move(action)  # Use make_move
+            if path is not None:
+                path.append(current_node)
         return current_node, game_state
 
+    def select_k_promising_nodes(self, k: int) -> list:
+        """
+        Selects k leaves to explore in one iteration. Virtual loss is applied along
+        each selected path so that later selections diverge from earlier ones; the
+        caller removes it once the real results are known. Returns a list of
+        (node, game_state, path) tuples.
+        """
+        selections = []
+        for _ in range(k):
+            path = []
+            node, game_state = self.select_promising_node(path)
+            self.apply_virtual_loss(path, MCTSMeta.VIRTUAL_LOSS)
+            selections.append((node, game_state, path))
+        return selections
+
+    def apply_virtual_loss(self, path: list, loss: int) -> None:
+        """
+        Counts loss extra lost visits on every node of the path; a negative loss
+        removes them again.
+        """
+        for node in path:
+            node.visit_count += loss
+            node.win_count -= loss
+
     def expand_node(self, parent_node: TreeNode, game_state: ConnectState) -> bool:
         """
-        Expands the given node by adding all possible actions as children.
+        Expands the given node by adding all possible actions as children. A child
+        position already in the transposition table links to the existing node.
         """
         if game_state.is_game_over():  # Use is_game_over
             return False
-        child_nodes = [TreeNode(action, parent_node) for action in game_state.available_moves()]  # Use available_moves
+        depth = parent_node.depth + 1
+        child_nodes = {}
+        for action in game_state.available_moves():  # Use available_moves
+            key = self.child_key(game_state, action)
+            child = self.tt.get(key)
+            if child is None:
+                child = TreeNode(action, parent_node)
+                child.depth = depth
+                child.key = key
+                self.tt[key] = child
+                self.node_count += 1
+            else:
+                child.parents.append(parent_node)
+            child_nodes[action] = child
         parent_node.add_children(child_nodes)
+        if depth > self.max_depth:
+            self.max_depth = depth
         return True
 
+    @staticmethod
+    def child_key(game_state: ConnectState, action: int) -> tuple:
+        """
+        Returns the transposition table key of the position after playing action,
+        updating the parent's Zobrist hash instead of making the move.
+        """
+        player = game_state.current_player
+        next_player = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        return game_state.zhash ^ GameMeta.ZOBRIST[player - 1][game_state.column_heights[action]][action], next_player
+
     def simulate_random_playout(self, game_state: ConnectState) -> int:
         """
-        Simulates a random playout from the given game state until the game ends.
+        Simulates a random playout from the given game state until the game ends,
+        using the compiled rollout kernel when Numba is available.
         """
-        while not game_state.is_game_over():  # Use is_game_over
-            game_state.make_move(random.choice(game_state.available_moves()))  # Use make_move and available_moves
-        return game_state.get_winner()  # Use get_winner
+        if playout is not None:
+            heights = np.array(game_state.column_heights, dtype=np.int8)
+            return playout(game_state.bb[0], game_state.bb[1], heights, game_state.current_player, np.uint64(random.getrandbits(64) | 1))
+        while True:
+            is_over, outcome = game_state.terminal_state()
+            if is_over:
+                return outcome
+            game_state.make_move(game_state.random_legal_move())
 
-    def backpropagate(self, node: TreeNode, current_turn: int, outcome: int) -> None:
+    def simulate_batch_playout(self, game_state: ConnectState, n: int) -> list:
         """
-        Backpropagates the result of a simulation through the tree.
+        Simulates n random playouts from the given game state and returns how often
+        each outcome occurred, indexed by outcome. The playouts run in parallel
+        threads when Numba is available.
         """
-        reward = 0 if outcome == current_turn else 1
-        while node:
-            node.visit_count += 1
-            node.win_count += reward
-            node = node.parent_node
-            reward = 0 if outcome == GameMeta.OUTCOMES['draw'] else 1 - reward
+        if batch_playout is not None:
+            heights = np.array(game_state.column_heights, dtype=np.int8)
+            return batch_playout(game_state.bb[0], game_state.bb[1], heights, game_state.current_player, np.uint64(random.getrandbits(64)), n).tolist()
+        outcomes = [0] * (GameMeta.OUTCOMES['draw'] + 1)
+        for _ in range(n):
+            outcomes[self.simulate_random_playout(game_state.clone())] += 1
+        return outcomes
+
+    def backpropagate(self, node: TreeNode, reward: int, visits: int, draws: int = 0) -> None:
+        """
+        Backpropagates the results of a batch of simulations through the tree.
+        reward is the number of wins for the player who moved into the node, and
+        the decisive results swap sides at each level up; draws count as a visit
+        but a win for neither side. Ancestors are walked level by level, and since
+        every node on a level has the same depth, only parents shared within a
+        level need deduplicating.
+        """
+        decisive = visits - draws
+        level = [node]
+        while level:
+            parents = []
+            for node in level:
+                node.visit_count += visits
+                node.win_count += reward
+                parents += node.parents
+            level = list(dict.fromkeys(parents)) if len(parents) > 1 else parents
+            reward = decisive - reward
 
     def run_search(self, time_limit: int):
         """
-        Conducts the MCTS for a specified time limit.
+        Conducts the MCTS for a specified time limit. The root is left expanded so
+        that any reply can reuse its subtree in perform_move.
         """
-        start_time = time.process_time()
-        while time.process_time() - start_time < time_limit:
-            node, state = self.select_promising_node()
-            outcome = self.simulate_random_playout(state)
-            self.backpropagate(node, state.current_player, outcome)  # Use current_player
-            self.rollout_count += 1
-        self.execution_time = time.process_time() - start_time
+        self._run_search(time_limit, MCTSMeta.LEAF_BATCH, self.simulate_batch_playout)
+
+    def run_search_gpu(self, time_limit: int, batch: int = 4096, device: str = 'cuda'):
+        """
+        Conducts the MCTS for a specified time limit like run_search, but launches
+        batch rollouts from every selected leaf as tensor operations on the device.
+        Requires PyTorch.
+        """
+        from gpu_rollouts import batch_playout as gpu_batch_playout
+
+        def simulate(game_state, n):
+            return gpu_batch_playout(game_state.bb[0], game_state.bb[1], game_state.column_heights,
+                                     game_state.current_player, n, device, random.getrandbits(63))
+
+        self._run_search(time_limit, batch, simulate)
+
+    def _run_search(self, time_limit: int, leaf_batch: int, simulate) -> None:
+        """
+        Runs search iterations for the time limit, playing leaf_batch playouts from
+        each selected leaf with simulate(game_state, n), which returns the count of
+        each outcome indexed by outcome.
+        """
+        start_time = time.perf_counter()
+        while time.perf_counter() - start_time < time_limit:
+            selections = self.select_k_promising_nodes(MCTSMeta.PARALLEL_LEAVES)
+            # Map repeated selections of one leaf (e.g. a terminal node) onto a single, larger batch
+            leaves = {}
+            for node, state, _ in selections:
+                if node in leaves:
+                    leaves[node][1] += leaf_batch
+                else:
+                    leaves[node] = [state, leaf_batch]
+            results = [(node, state, visits, simulate(state, visits)) for node, (state, visits) in leaves.items()]
+            for _, _, path in selections:
+                self.apply_virtual_loss(path, -MCTSMeta.VIRTUAL_LOSS)
+            for node, state, visits, outcomes in results:
+                # The player who moved into the leaf is the one not to move in it
+                mover = GameMeta.PLAYERS['two'] if state.current_player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+                self.backpropagate(node, outcomes[mover], visits, outcomes[GameMeta.OUTCOMES['draw']])
+                self.rollout_count += visits
+        if self.root_node.children is None:
+            self.expand_node(self.root_node, self.root_state)
+        self.execution_time = time.perf_counter() - start_time
+
+    def run_search_parallel(self, time_limit: int, n_workers: int):
+        """
+        Conducts the MCTS with root parallelization: each worker process searches
+        independently from the root state for the time limit, and the root's children
+        are rebuilt with the visit and win counts summed over all workers. Workers are
+        spawned rather than forked, since forking a process whose Numba thread pool
+        is already running deadlocks; spawning re-imports the main module, so callers
+        must guard their entry point with `if __name__ == "__main__":` or the pool
+        hangs. The pool is kept for later calls, and every worker stops at a shared
+        deadline so that starting it up counts against the time limit. Call close()
+        to shut it down.
+        """
+        if n_workers == 1:
+            return self.run_search(time_limit)
+        start_time = time.perf_counter()
+        deadline = time.time() + time_limit  # Wall clock, comparable across processes
+        base_seed = random.getrandbits(32)
+        pool = self._get_pool(n_workers)
+        results = pool.starmap(_search_worker, [(self.root_state, deadline, base_seed + seed) for seed in range(n_workers)])
+        merged = {}
+        for children, rollouts, _ in results:
+            for action, (visits, wins) in children.items():
+                total_visits, total_wins = merged.get(action, (0, 0))
+                merged[action] = (total_visits + visits, total_wins + wins)
+            self.rollout_count += rollouts
+        self.root_node = TreeNode(None, None)
+        self.root_node.depth = self.root_state.move_count
+        self.max_depth = self.root_node.depth + max(depth for _, _, depth in results) - 1
+        self.tt = {}
+        child_nodes = {}
+        for action, (visits, wins) in merged.items():
+            child = TreeNode(action, self.root_node)
+            child.depth = self.root_node.depth + 1
+            child.key = self.child_key(self.root_state, action)
+            child.visit_count = visits
+            child.win_count = wins
+            child_nodes[action] = child
+            self.tt[child.key] = child
+        if child_nodes:  # Leave a terminal root unexpanded, selection descends into any children list
+            self.root_node.add_children(child_nodes)
+        self.root_node.visit_count = sum(visits for visits, _ in merged.values())
+        self.execution_time = time.perf_counter() - start_time
+
+    def _get_pool(self, n_workers: int):
+        """
+        Returns the pool of worker processes, spawning it on first use or when the
+        number of workers changes.
+        """
+        if self._pool is None or self._pool_workers != n_workers:
+            self.close()
+            self._pool = multiprocessing.get_context('spawn').Pool(n_workers, initializer=_init_worker)
+            self._pool_workers = n_workers
+        return self._pool
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes of run_search_parallel, if any.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._pool_workers = 0
 
     def determine_best_move(self):
         """
@@ -112,20 +345,51 @@ class MonteCarloTreeSearch:
         """
         if self.root_state.is_game_over():  # Use is_game_over
             return -1
-        max_visits = max(child.visit_count for child in self.root_node.children.values())
-        best_children = [child for child in self.root_node.children.values() if child.visit_count == max_visits]
-        best_choice = random.choice(best_children)
-        return best_choice.action
+        children_nodes = self.root_node.child_items()
+        max_visits = max(child.visit_count for _, child in children_nodes)
+        best_actions = [action for action, child in children_nodes if child.visit_count == max_visits]
+        return random.choice(best_actions)
     def perform_move(self, action):
-        """0
-        Updates the root to the child corresponding to the given action.
         """
-        if action in self.root_node.children:
-            self.root_state.make_move(action)  # Use make_move
-            self.root_node = self.root_node.children[action]
+        Updates the root to the child corresponding to the given action. Without such
+        a child, a node for the resulting position found in the transposition table
+        is reused before falling back to a fresh root. The tree is then pruned to the
+        new root's subtree, and the root is expanded so that every legal reply has a
+        child node to reuse on the next move.
+        """
+        child = self.root_node.children[action] if self.root_node.children else None
+        self.root_state.make_move(action)  # Use make_move
+        if child is None:
+            child = self.tt.get((self.root_state.zhash, self.root_state.current_player))
+        if child is not None:
+            self.root_node = child
         else:
-            self.root_state.make_move(action)  # Use make_move
             self.root_node = TreeNode(None, None)
+            self.root_node.depth = self.root_state.move_count
+            self.root_node.key = (self.root_state.zhash, self.root_state.current_player)
+        self.prune_to_root()
+        if self.root_node.children is None:
+            self.expand_node(self.root_node, self.root_state)
+
+    def prune_to_root(self) -> None:
+        """
+        Rebuilds the transposition table from the root's subtree and drops parent
+        links leading outside it, so discarded branches can be freed and
+        backpropagation stops at the root. Also recomputes the maximum depth.
+        """
+        subtree = {self.root_node}
+        stack = [self.root_node]
+        while stack:
+            for _, child in stack.pop().child_items():
+                if child not in subtree:
+                    subtree.add(child)
+                    stack.append(child)
+        self.tt = {}
+        for node in subtree:
+            node.parents = [parent for parent in node.parents if parent in subtree]
+            if node.key is not None:
+                self.tt[node.key] = node
+        self.max_depth = max(node.depth for node in subtree)
 
     def get_statistics(self) -> tuple:
         """
@@ -135,15 +399,30 @@ class MonteCarloTreeSearch:
 
     def get_max_depth(self):
         """
-        Calculates the maximum depth of the tree.
+        Returns the maximum depth of the tree below the root, counting the root as 1.
         """
+        return self.max_depth - self.root_node.depth + 1
 
-        def depth(node):
-            if not node.children:
-                return 1
-            return 1 + max(depth(child) for child in node.children.values())
+def _init_worker() -> None:
+    """
+    Prepares a run_search_parallel worker process. Its batch playouts are pinned to
+    one Numba thread, since the workers already occupy the cores between them.
+    """
+    if batch_playout is not None:
+        import numba
+        numba.set_num_threads(1)
 
-        return depth(self.root_node)  # Call depth on root_node
+def _search_worker(state: ConnectState, deadline: float, seed: int) -> tuple:
+    """
+    Runs an independent serial search from the given state until the wall-clock
+    deadline and returns the visit and win counts of the root's children along with
+    the number of rollouts performed and the depth reached.
+    """
+    random.seed(seed)
+    mcts = MonteCarloTreeSearch(state)
+    mcts.run_search(max(0.0, deadline - time.time()))
+    children = {action: (child.visit_count, child.win_count) for action, child in mcts.root_node.child_items()}
+    return children, mcts.rollout_count, mcts.get_max_depth()
 
 def play_game():
     state = ConnectState()
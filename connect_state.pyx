@@ -0,0 +1,245 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled drop-in replacement for ConnectState.ConnectState. Build it in place with
+`python setup.py build_ext --inplace`; Mcts imports it when available.
+"""
+import random
+from libc.string cimport memcpy
+from meta import GameMeta
+
+cdef enum:
+    ROWS = 6
+    COLS = 7
+    BB_HEIGHT = ROWS + 1
+    CELLS = ROWS * COLS
+    MAX_WIN_LINES = 13  # Most four-in-a-row lines through a single cell
+
+if (GameMeta.ROWS, GameMeta.COLS) != (ROWS, COLS):
+    raise ImportError('connect_state was compiled for a different board size')
+
+cdef int PLAYER_NONE = GameMeta.PLAYERS['none']
+cdef int PLAYER_ONE = GameMeta.PLAYERS['one']
+cdef int PLAYER_TWO = GameMeta.PLAYERS['two']
+cdef int DRAW = GameMeta.OUTCOMES['draw']
+
+cdef unsigned long long ZOBRIST[2][ROWS][COLS]
+for _player in range(2):
+    for _row in range(ROWS):
+        for _col in range(COLS):
+            ZOBRIST[_player][_row][_col] = GameMeta.ZOBRIST[_player][_row][_col]
+
+cdef unsigned long long WIN_LINES[ROWS][COLS][MAX_WIN_LINES]
+cdef int WIN_LINE_COUNTS[ROWS][COLS]
+for _row in range(ROWS):
+    for _col in range(COLS):
+        WIN_LINE_COUNTS[_row][_col] = len(GameMeta.WIN_LINES[_row][_col])
+        for _line, _mask in enumerate(GameMeta.WIN_LINES[_row][_col]):
+            WIN_LINES[_row][_col][_line] = _mask
+
+
+cdef inline bint check_win(unsigned long long bb) nogil:
+    """
+    Determines if the bitboard holds four in a row in any direction.
+    """
+    cdef unsigned long long m
+    m = bb & (bb >> 1)
+    if m & (m >> 2):
+        return True
+    m = bb & (bb >> (BB_HEIGHT - 1))
+    if m & (m >> (2 * (BB_HEIGHT - 1))):
+        return True
+    m = bb & (bb >> BB_HEIGHT)
+    if m & (m >> (2 * BB_HEIGHT)):
+        return True
+    m = bb & (bb >> (BB_HEIGHT + 1))
+    if m & (m >> (2 * (BB_HEIGHT + 1))):
+        return True
+    return False
+
+
+cdef class ConnectState:
+    cdef unsigned long long _bb[2]
+    cdef signed char _heights[COLS]
+    cdef int _last_victory
+    cdef public int current_player
+    cdef public int move_count
+    cdef public unsigned long long zhash
+    cdef public object last_move
+
+    def __init__(self):
+        """
+        Initializes the ConnectState with an empty bitboard for each player, sets the
+        current player, initializes column heights, and tracks the last move made
+        along with the Zobrist hash of the position and the cached victory check.
+        """
+        cdef int col
+        self._bb[0] = 0
+        self._bb[1] = 0
+        for col in range(COLS):
+            self._heights[col] = ROWS - 1
+        self._last_victory = -1
+        self.current_player = PLAYER_ONE
+        self.move_count = 0
+        self.zhash = 0
+        self.last_move = None
+
+    def __reduce__(self):
+        return ConnectState, (), (self._bb[0], self._bb[1], self.column_heights, self.current_player,
+                                  self.last_move, self.move_count, self.zhash)
+
+    def __setstate__(self, state):
+        cdef int col
+        self._bb[0], self._bb[1], heights, self.current_player, self.last_move, self.move_count, self.zhash = state
+        for col in range(COLS):
+            self._heights[col] = heights[col]
+        self._last_victory = -1
+
+    @property
+    def bb(self):
+        """
+        The two bitboards as a list of ints, player one first.
+        """
+        return [self._bb[0], self._bb[1]]
+
+    @property
+    def column_heights(self):
+        """
+        The row of the next free cell in each column as a list, -1 once full.
+        """
+        return [self._heights[col] for col in range(COLS)]
+
+    cpdef ConnectState clone(self):
+        """
+        Returns a copy of the state.
+        """
+        cdef ConnectState state = ConnectState.__new__(ConnectState)
+        memcpy(state._bb, self._bb, sizeof(self._bb))
+        memcpy(state._heights, self._heights, sizeof(self._heights))
+        state._last_victory = self._last_victory
+        state.current_player = self.current_player
+        state.move_count = self.move_count
+        state.zhash = self.zhash
+        state.last_move = self.last_move
+        return state
+
+    cpdef int cell(self, int row, int col):
+        """
+        Returns the player occupying (row, col), read directly from the bitboards.
+        """
+        cdef int shift = col * BB_HEIGHT + ROWS - 1 - row
+        if self._bb[0] >> shift & 1:
+            return PLAYER_ONE
+        if self._bb[1] >> shift & 1:
+            return PLAYER_TWO
+        return PLAYER_NONE
+
+    def get_board(self):
+        """
+        Reconstructs the board from the bitboards as a list of rows, top row first.
+        """
+        return [[self.cell(row, col) for col in range(COLS)] for row in range(ROWS)]
+
+    cpdef void make_move(self, int col):
+        """
+        Makes a move in the specified column, sets the player's bit on their bitboard,
+        tracks the last move, updates the Zobrist hash, adjusts column heights, and
+        switches to the other player. Raises ValueError if the column is off the
+        board or full, since the arrays below are not bounds checked.
+        """
+        cdef int player = self.current_player
+        cdef int row
+        if not (0 <= col < COLS and self._heights[col] >= 0):
+            raise ValueError(f'column {col} is not a legal move')
+        row = self._heights[col]
+        self._bb[player - 1] ^= 1ULL << (col * BB_HEIGHT + ROWS - 1 - row)
+        self.zhash ^= ZOBRIST[player - 1][row][col]
+        self.last_move = (row, col)
+        self._heights[col] = row - 1
+        self.move_count += 1
+        self._last_victory = -1
+        self.current_player = PLAYER_TWO if player == PLAYER_ONE else PLAYER_ONE
+
+    cpdef list available_moves(self):
+        """
+        Returns a list of columns that are not full and can accept a new move.
+        """
+        return [col for col in range(COLS) if self._heights[col] >= 0]
+
+    def random_legal_move(self, rand=random.random):
+        """
+        Returns a uniformly random column that can accept a move, rejection sampling
+        the column heights. The board must not be full.
+        """
+        cdef int col
+        while True:
+            col = <int>(rand() * COLS)
+            if self._heights[col] >= 0:
+                return col
+
+    cpdef int check_victory(self):
+        """
+        Checks if the last move resulted in a victory for the player who made the move.
+        The result is cached until the next move.
+        """
+        cdef int player
+        if self._last_victory < 0:
+            player = PLAYER_TWO if self.current_player == PLAYER_ONE else PLAYER_ONE
+            self._last_victory = player if check_win(self._bb[player - 1]) else 0
+        return self._last_victory
+
+    cpdef bint is_winning_move(self, int row, int col):
+        """
+        Determines if the move at (row, col) completed four in a row for the player
+        who made it, testing only the precomputed win lines through that cell.
+        """
+        cdef int player = self.cell(row, col)
+        cdef unsigned long long bb, line
+        cdef int i
+        if player == PLAYER_NONE:
+            return False
+        bb = self._bb[player - 1]
+        for i in range(WIN_LINE_COUNTS[row][col]):
+            line = WIN_LINES[row][col][i]
+            if bb & line == line:
+                return True
+        return False
+
+    def is_game_over(self):
+        """
+        Checks if the game is over either by a win or a draw.
+        """
+        return self.check_victory() or self.move_count == CELLS
+
+    cpdef tuple terminal_state(self):
+        """
+        Returns a tuple (is_over, outcome) from a single victory check, where the
+        outcome is the winner, 'draw', or 'none' while the game continues.
+        """
+        cdef int winner = self.check_victory()
+        if winner:
+            return True, winner
+        if self.move_count == CELLS:
+            return True, DRAW
+        return False, GameMeta.OUTCOMES['none']
+
+    def get_winner(self):
+        """
+        Returns the outcome of the game. If the game is a draw, it returns 'draw',
+        otherwise it returns the winner ('one' or 'two').
+        """
+        if self.move_count == CELLS and self.check_victory() == 0:
+            return DRAW
+        return GameMeta.OUTCOMES['one'] if self.check_victory() == PLAYER_ONE else GameMeta.OUTCOMES['two']
+
+    def display(self):
+        """
+        Displays the current board state in a formatted manner.
+        """
+        print('==============================')
+        for row in range(ROWS):
+            for col in range(COLS):
+                player = self.cell(row, col)
+                token = 'X' if player == PLAYER_ONE else 'O' if player == PLAYER_TWO else ' '
+                print(f'| {token} ', end='')
+            print('|')
+        print('==============================')
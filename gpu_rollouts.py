@@ -0,0 +1,67 @@
+import torch
+from meta import GameMeta
+
+ROWS = GameMeta.ROWS
+COLS = GameMeta.COLS
+BB_HEIGHT = GameMeta.BB_HEIGHT
+PLAYER_ONE = GameMeta.PLAYERS['one']
+PLAYER_TWO = GameMeta.PLAYERS['two']
+DRAW = GameMeta.OUTCOMES['draw']
+
+
+def check_win(bb):
+    """
+    Returns a boolean tensor marking the bitboards that hold four in a row.
+    """
+    won = torch.zeros_like(bb, dtype=torch.bool)
+    for shift in GameMeta.BB_SHIFTS:
+        m = bb & (bb >> shift)
+        won |= (m & (m >> (2 * shift))) != 0
+    return won
+
+
+def batch_playout(bb0, bb1, heights, player, n, device='cuda', seed=None):
+    """
+    Plays n random games from the same position in lockstep as tensor operations
+    and returns how often each outcome occurred, indexed by outcome. Every step
+    samples one legal column per game and applies it with bitwise ops; finished
+    games stay masked until the longest one ends. The loop runs a fixed number of
+    steps so the device is never synchronised mid-batch.
+    """
+    generator = torch.Generator(device=device)
+    if seed is not None:
+        generator.manual_seed(seed)
+    else:
+        generator.seed()
+    b0 = torch.full((n,), bb0, dtype=torch.int64, device=device)
+    b1 = torch.full((n,), bb1, dtype=torch.int64, device=device)
+    h = torch.tensor(list(heights), dtype=torch.int64, device=device).repeat(n, 1)
+    to_move = torch.full((n,), player, dtype=torch.int64, device=device)
+    outcome = torch.zeros(n, dtype=torch.int64, device=device)
+    active = torch.ones(n, dtype=torch.bool, device=device)
+    one = torch.ones(n, dtype=torch.int64, device=device)
+
+    moves_left = sum(height + 1 for height in heights)
+    for _ in range(moves_left + 1):
+        # Only the player who just moved can have won
+        one_to_move = to_move == PLAYER_ONE
+        won = active & check_win(torch.where(one_to_move, b1, b0))
+        outcome = torch.where(won, torch.where(one_to_move, PLAYER_TWO, PLAYER_ONE), outcome)
+        active &= ~won
+
+        legal = h >= 0
+        drawn = active & ~legal.any(dim=1)
+        outcome = torch.where(drawn, DRAW, outcome)
+        active &= ~drawn
+
+        # Finished games sample from all columns, their moves are masked out below
+        weights = (legal | ~active.unsqueeze(1)).float()
+        col = torch.multinomial(weights, 1, generator=generator).squeeze(1)
+        row = h.gather(1, col.unsqueeze(1)).squeeze(1)
+        bit = torch.where(active, one << (col * BB_HEIGHT + ROWS - 1 - row), 0)
+        b0 |= torch.where(one_to_move, bit, 0)
+        b1 |= torch.where(one_to_move, 0, bit)
+        h.scatter_add_(1, col.unsqueeze(1), -active.long().unsqueeze(1))
+        to_move = torch.where(active, torch.where(one_to_move, PLAYER_TWO, PLAYER_ONE), to_move)
+
+    return torch.bincount(outcome, minlength=DRAW + 1).tolist()
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 
 class GameMeta:
@@ -27,6 +28,52 @@ class GameMeta:
     ROWS = 6
     COLS = 7
 
+    # Bitboard layout: each column takes ROWS + 1 bits, bottom cell first. The spare
+    # bit on top of every column keeps the shifts of the win check from wrapping.
+    BB_HEIGHT = ROWS + 1
+
+    # Shifts of the win check: vertical, diagonal, horizontal and anti-diagonal
+    BB_SHIFTS = (1, BB_HEIGHT - 1, BB_HEIGHT, BB_HEIGHT + 1)
+
+    # Zobrist keys indexed by [player - 1][row][col], fixed seed so hashes are reproducible
+    ZOBRIST = np.random.SeedSequence(0).generate_state(2 * ROWS * COLS, dtype=np.uint64).reshape(2, ROWS, COLS).tolist()
+
+
+def _build_free_moves():
+    """
+    Maps every combination of free top cells to the tuple of columns it leaves open.
+    """
+    free_moves = {}
+    for combination in range(1 << GameMeta.COLS):
+        cols = tuple(col for col in range(GameMeta.COLS) if combination >> col & 1)
+        free_moves[sum(1 << (col * GameMeta.BB_HEIGHT + GameMeta.ROWS - 1) for col in cols)] = cols
+    return free_moves
+
+
+def _build_win_lines():
+    """
+    Lists, for every cell, the bitmasks of all four-in-a-row lines passing through it.
+    """
+    lines = [[[] for _ in range(GameMeta.COLS)] for _ in range(GameMeta.ROWS)]
+    for row in range(GameMeta.ROWS):
+        for col in range(GameMeta.COLS):
+            for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                for k in range(-3, 1):
+                    cells = [(row + dr * (k + i), col + dc * (k + i)) for i in range(4)]
+                    if all(0 <= r < GameMeta.ROWS and 0 <= c < GameMeta.COLS for r, c in cells):
+                        lines[row][col].append(sum(1 << (c * GameMeta.BB_HEIGHT + GameMeta.ROWS - 1 - r) for r, c in cells))
+    return [[tuple(lines[row][col]) for col in range(GameMeta.COLS)] for row in range(GameMeta.ROWS)]
+
+
+# Bits of the top cell of every column; a column accepts a move while its bit is free
+GameMeta.TOP_MASK = sum(1 << (col * GameMeta.BB_HEIGHT + GameMeta.ROWS - 1) for col in range(GameMeta.COLS))
+
+# Open columns for each value of the free top cells mask
+GameMeta.FREE_MOVES = _build_free_moves()
+
+# Win line bitmasks through each cell, indexed by [row][col]
+GameMeta.WIN_LINES = _build_win_lines()
+
 
 class MCTSMeta:
     """
@@ -34,3 +81,13 @@ class MCTSMeta:
     """
     # Exploration constant for the UCT formula
     EXPLORATION = math.sqrt(2)
+
+    # Visit counts below this use precomputed logs and inverse square roots in UCT
+    UCT_TABLE_SIZE = 1 << 16
+
+    # Random playouts run from each selected leaf
+    LEAF_BATCH = 8
+
+    # Leaves selected per search iteration, kept apart by virtual loss
+    PARALLEL_LEAVES = 8
+    VIRTUAL_LOSS = 3
@@ -0,0 +1,97 @@
+import numpy as np
+from numba import njit, prange
+from meta import GameMeta
+
+# Numba freezes module globals as compile-time constants, so unpack the dicts here
+ROWS = GameMeta.ROWS
+COLS = GameMeta.COLS
+BB_HEIGHT = GameMeta.BB_HEIGHT
+BB_SHIFTS = GameMeta.BB_SHIFTS
+PLAYER_ONE = GameMeta.PLAYERS['one']
+PLAYER_TWO = GameMeta.PLAYERS['two']
+DRAW = GameMeta.OUTCOMES['draw']
+
+
+@njit(cache=True)
+def check_win(bb):
+    """
+    Determines if the bitboard holds four in a row in any direction.
+    """
+    for shift in BB_SHIFTS:
+        m = bb & (bb >> shift)
+        if m & (m >> (2 * shift)):
+            return True
+    return False
+
+
+@njit(cache=True, boundscheck=False)
+def playout(bb0, bb1, heights, player, rng_state):
+    """
+    Plays uniformly random moves from the given position until the game ends and
+    returns the outcome. `heights` holds the ConnectState column heights as an int8
+    array and is modified in place; `rng_state` is a nonzero uint64 xorshift seed.
+    """
+    open_cols = np.empty(COLS, dtype=np.int64)
+    x = np.uint64(rng_state)
+    while True:
+        # Only the player who just moved can have won
+        if player == PLAYER_ONE:
+            if check_win(bb1):
+                return PLAYER_TWO
+        elif check_win(bb0):
+            return PLAYER_ONE
+
+        n = 0
+        for col in range(COLS):
+            if heights[col] >= 0:
+                open_cols[n] = col
+                n += 1
+        if n == 0:
+            return DRAW
+
+        x ^= x << np.uint64(13)
+        x ^= x >> np.uint64(7)
+        x ^= x << np.uint64(17)
+        col = open_cols[x % np.uint64(n)]
+
+        bit = np.int64(1) << (col * BB_HEIGHT + ROWS - 1 - heights[col])
+        heights[col] -= 1
+        if player == PLAYER_ONE:
+            bb0 |= bit
+            player = PLAYER_TWO
+        else:
+            bb1 |= bit
+            player = PLAYER_ONE
+
+
+@njit(cache=True)
+def splitmix64(x):
+    """
+    Scrambles a uint64 counter into a well-mixed uint64, used to seed each playout.
+    """
+    x += np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+@njit(parallel=True, cache=True)
+def batch_playout(bb0, bb1, heights, player, seed, n):
+    """
+    Runs n independent random playouts from the same position across threads and
+    returns how often each outcome occurred, indexed by outcome.
+    """
+    outcomes = np.empty(n, dtype=np.int64)
+    for i in prange(n):
+        rng_state = splitmix64(np.uint64(seed) + np.uint64(i)) | np.uint64(1)
+        outcomes[i] = playout(bb0, bb1, heights.copy(), player, rng_state)
+    # Count serially, concurrent increments of one array element would race
+    wins = np.zeros(DRAW + 1, dtype=np.int64)
+    for i in range(n):
+        wins[outcomes[i]] += 1
+    return wins
+
+
+# Compile (or load from the cache) at import so the first search is not spent in the JIT
+playout(0, 0, np.full(COLS, ROWS - 1, dtype=np.int8), PLAYER_ONE, np.uint64(1))
+batch_playout(0, 0, np.full(COLS, ROWS - 1, dtype=np.int8), PLAYER_ONE, np.uint64(1), 1)
@@ -0,0 +1,15 @@
+"""
+Builds the compiled ConnectState extension in place:
+
+    python setup.py build_ext --inplace
+"""
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+setup(
+    name='ConnectState',
+    ext_modules=cythonize(
+        [Extension('connect_state', ['connect_state.pyx'], extra_compile_args=['-O3', '-march=native'])],
+        language_level=3,
+    ),
+)